@@ -472,25 +472,45 @@ func (p *processor) process(inputFile string, allDec []common.DecoderFactory) er
 		}
 	}
 
+	// write to a temporary file next to the destination and rename it on success,
+	// so an interrupted conversion never leaves a truncated file at outPath
+	tmpPath := partialOutputPath(outPath)
+	defer os.Remove(tmpPath) // no-op after a successful rename
+
 	if params.Meta == nil {
-		outFile, err := os.OpenFile(outPath, os.O_CREATE|os.O_WRONLY|os.O_TRUNC, 0644)
+		outFile, err := os.OpenFile(tmpPath, os.O_CREATE|os.O_WRONLY|os.O_TRUNC, 0644)
 		if err != nil {
 			return err
 		}
-		defer outFile.Close()
 
 		if _, err := io.Copy(outFile, audio); err != nil {
+			outFile.Close()
+			return err
+		}
+		if err := outFile.Close(); err != nil {
 			return err
 		}
 	} else {
 		ctx, cancel := context.WithTimeout(context.Background(), time.Minute)
 		defer cancel()
 
-		if err := ffmpeg.UpdateMeta(ctx, outPath, params, logger); err != nil {
+		if err := ffmpeg.UpdateMeta(ctx, tmpPath, params, logger); err != nil {
 			return err
 		}
 	}
 
+	if err := os.Rename(tmpPath, outPath); err != nil {
+		return fmt.Errorf("rename output file failed: %w", err)
+	}
+
 	logger.Info("successfully converted", zap.String("source", inputFile), zap.String("destination", outPath))
 	return nil
 }
+
+// partialOutputPath returns the temporary path used while writing outPath.
+// It keeps the audio extension so ffmpeg can still infer the output format.
+func partialOutputPath(outPath string) string {
+	ext := filepath.Ext(outPath)
+	name := strings.TrimSuffix(filepath.Base(outPath), ext)
+	return filepath.Join(filepath.Dir(outPath), "."+name+".unlocking"+ext)
+}
@@ -10,12 +10,563 @@ import os
 import subprocess
 import threading
 import json
+import time
+import shutil
+import socket
+import hashlib
+import secrets
+import cProfile
+import pstats
+import platform
+import tracemalloc
+import functools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
+from job_server import DEFAULT_PORT, TOKEN_ENV_VAR, JobServer, find_um_executable, parse_um_destination, run_um
 # 移除拖拽相关导入和类
 
+
+def get_device_id(path: str) -> int:
+    """返回路径所在存储设备的编号（os.stat().st_dev）
+
+    输出目录可能尚未创建，此时向上查找最近的已存在目录；完全无法获取时返回 -1。
+    """
+    current = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(current).st_dev
+        except OSError:
+            parent = os.path.dirname(current)
+            if parent == current:
+                return -1
+            current = parent
+
+
+class DeviceIOLimiter:
+    """按存储设备限制并发任务数
+
+    每个任务同时占用源文件所在设备和输出目录所在设备的配额（同一设备只计一次），
+    这样 NAS/机械硬盘上的读取不会因为并发过高而频繁寻道，SSD 等快速设备仍可并行。
+    limits 为显式配置的固定配额；initial_limits 为各设备的初始配额（如源盘与输出盘不同的默认值），
+    其余设备使用 default_limit。开启自动调节时，按设备统计最近一批任务的实测吞吐量（MB/s），
+    吞吐量上升则继续沿当前方向调整配额，下降则反向调整，基本不变则保持。
+    """
+
+    # 每个设备至少完成多少个任务后评估一次吞吐量
+    TUNE_WINDOW = 8
+    # 吞吐量变化超过该比例才视为有效变化
+    TUNE_TOLERANCE = 0.05
+
+    def __init__(self, default_limit: int = 2, max_limit: int = 8, auto_tune: bool = True,
+                 limits: Optional[Dict[int, int]] = None,
+                 initial_limits: Optional[Dict[int, int]] = None,
+                 on_adjust: Optional[Callable[[int, int, float], None]] = None):
+        self.max_limit = max(1, max_limit)
+        self.default_limit = min(max(1, default_limit), self.max_limit)
+        self.auto_tune = auto_tune
+        self.on_adjust = on_adjust
+        self._lock = threading.Lock()
+        self._limits: Dict[int, int] = {
+            dev: min(max(1, limit), self.max_limit) for dev, limit in (initial_limits or {}).items()
+        }
+        # 显式配置的设备配额固定，不参与自动调节
+        fixed = {dev: min(max(1, limit), self.max_limit) for dev, limit in (limits or {}).items()}
+        self._limits.update(fixed)
+        self._fixed = set(fixed)
+        self._active: Dict[int, int] = {}
+        self._stats: Dict[int, dict] = {}
+
+    def limit_for(self, dev: int) -> int:
+        """返回设备当前的并发上限"""
+        with self._lock:
+            return self._limits.get(dev, self.default_limit)
+
+    def try_acquire(self, devices: Iterable[int]) -> bool:
+        """尝试一次性占用所有设备的配额，任一设备已满则不占用并返回 False"""
+        devices = set(devices)
+        with self._lock:
+            for dev in devices:
+                if self._active.get(dev, 0) >= self._limits.get(dev, self.default_limit):
+                    return False
+            now = time.perf_counter()
+            for dev in devices:
+                self._active[dev] = self._active.get(dev, 0) + 1
+                self._stats.setdefault(dev, {
+                    'start': now, 'bytes': 0, 'jobs': 0, 'last_mbps': None, 'direction': 1
+                })
+            return True
+
+    def release(self, devices: Iterable[int], nbytes: int = 0):
+        """释放任务占用的配额，并记录该任务处理的数据量用于自动调节"""
+        adjustments = []
+        with self._lock:
+            for dev in set(devices):
+                self._active[dev] = max(0, self._active.get(dev, 0) - 1)
+                if self.auto_tune and dev not in self._fixed:
+                    adjusted = self._record(dev, nbytes)
+                    if adjusted:
+                        adjustments.append(adjusted)
+
+        if self.on_adjust:
+            for dev, limit, mbps in adjustments:
+                self.on_adjust(dev, limit, mbps)
+
+    def _record(self, dev: int, nbytes: int):
+        """累计设备吞吐量，满一个评估窗口时爬坡调整配额（调用方需持有锁）"""
+        stats = self._stats[dev]
+        stats['bytes'] += nbytes
+        stats['jobs'] += 1
+
+        limit = self._limits.get(dev, self.default_limit)
+        if stats['jobs'] < max(self.TUNE_WINDOW, 2 * limit):
+            return None
+
+        now = time.perf_counter()
+        elapsed = now - stats['start']
+        mbps = stats['bytes'] / elapsed / (1024 * 1024) if elapsed > 0 else 0.0
+        last_mbps = stats['last_mbps']
+
+        step = 0
+        if last_mbps is None or mbps > last_mbps * (1 + self.TUNE_TOLERANCE):
+            step = stats['direction']
+        elif mbps < last_mbps * (1 - self.TUNE_TOLERANCE):
+            stats['direction'] = -stats['direction']
+            step = stats['direction']
+
+        stats.update(start=now, bytes=0, jobs=0, last_mbps=mbps)
+
+        new_limit = min(max(1, limit + step), self.max_limit)
+        if new_limit == limit:
+            return None
+        self._limits[dev] = new_limit
+        return dev, new_limit, mbps
+
+
+# um 可能产出的音频扩展名（与 internal/sniff/audio.go 保持一致）
+OUTPUT_AUDIO_EXTS = ('.mp3', '.ogg', '.wav', '.wma', '.m4a', '.mp4', '.flac', '.dff')
+
+
+def default_journal_path() -> Path:
+    """批处理日志文件的默认位置"""
+    base = os.environ.get('APPDATA') or os.path.join(Path.home(), '.config')
+    return Path(base) / "UnlockMusicGUI" / "batch_journal.jsonl"
+
+
+class BatchJournal:
+    """只追加写入的批处理任务日志（JSON Lines）
+
+    每行记录一个任务状态变化：queued / running / done / failed（附失败原因），
+    程序关闭、崩溃或休眠后可据此恢复未完成和失败的任务。
+    写入只做 flush 不做 fsync，开销与日志输出相当；最后一行写了一半时读取会忽略它。
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = None
+        self._total = 0
+        self._done = 0
+
+    def start_batch(self, files: List[str], options: Dict[str, Any]):
+        """开始新批次：覆盖旧日志，写入批次设置和全部排队任务"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if self._file:
+                self._file.close()
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._total = len(files)
+            self._done = 0
+            now = time.time()
+            lines = [self._dump({'state': 'batch', 'ts': now, 'options': options})]
+            lines.extend(self._dump({'state': 'queued', 'path': path}) for path in files)
+            self._file.write("".join(lines))
+            self._file.flush()
+
+    def record(self, path: str, state: str, **extra):
+        """追加一条任务状态记录"""
+        with self._lock:
+            if not self._file:
+                return
+            if state == 'done':
+                self._done += 1
+            entry = {'state': state, 'path': path, 'ts': time.time()}
+            entry.update(extra)
+            self._file.write(self._dump(entry))
+            self._file.flush()
+
+    def finish(self):
+        """结束批次：全部成功时删除日志，否则保留以便下次恢复"""
+        with self._lock:
+            if not self._file:
+                return
+            self._file.close()
+            self._file = None
+            if self._done >= self._total:
+                self.discard()
+
+    def discard(self):
+        """删除日志文件"""
+        try:
+            self.path.unlink()
+        except OSError:
+            pass
+
+    def load_unfinished(self) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """读取上次批次的设置和所有未完成/失败的任务（按排队顺序）"""
+        options: Dict[str, Any] = {}
+        jobs: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get('state') == 'batch':
+                        options = entry.get('options', {})
+                    elif entry.get('path'):
+                        jobs.setdefault(entry['path'], {}).update(entry)
+        except OSError:
+            return options, []
+        return options, [job for job in jobs.values() if job.get('state') != 'done']
+
+    @staticmethod
+    def cleanup_partial_outputs(job: Dict[str, Any]) -> List[str]:
+        """删除中断任务留下的不完整输出文件，返回已删除的路径
+
+        um 先写入输出目录中的临时文件（.<文件名>.unlocking.<扩展名>），成功后才重命名为最终文件，
+        因此只需删除这些临时文件；已完成的输出文件不会被当作不完整文件删除。
+        """
+        output_dir = job.get('output_dir')
+        if not output_dir:
+            return []
+
+        # 解密器后缀可能包含多级扩展名（如 .kgm.flac），逐级去掉得到候选文件名
+        parts = os.path.basename(job['path']).split('.')
+        stems = {'.'.join(parts[:i]) for i in range(1, len(parts))}
+
+        removed = []
+        for stem in stems:
+            for ext in OUTPUT_AUDIO_EXTS:
+                candidate = os.path.join(output_dir, f".{stem}.unlocking{ext}")
+                try:
+                    os.remove(candidate)
+                    removed.append(candidate)
+                except OSError:
+                    continue
+        return removed
+
+    @staticmethod
+    def _dump(entry: Dict[str, Any]) -> str:
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+
+# 快速哈希读取文件头尾各多少字节
+PARTIAL_HASH_SIZE = 64 * 1024
+
+
+def _hash_file(path: str, partial: bool) -> Optional[str]:
+    """计算文件哈希：partial 为 True 时只读取文件头尾，否则读取全文"""
+    digest = hashlib.blake2b(digest_size=20)
+    try:
+        with open(path, "rb") as f:
+            if partial:
+                digest.update(f.read(PARTIAL_HASH_SIZE))
+                size = os.fstat(f.fileno()).st_size
+                if size > 2 * PARTIAL_HASH_SIZE:
+                    f.seek(size - PARTIAL_HASH_SIZE)
+                digest.update(f.read(PARTIAL_HASH_SIZE))
+            else:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def _group_by(paths: List[str], key: Callable[[str], Any]) -> List[List[str]]:
+    """按 key 分组，key 为 None 的文件各自单独成组，保持原有顺序"""
+    groups: Dict[Any, List[str]] = {}
+    singles = []
+    for path in paths:
+        value = key(path)
+        if value is None:
+            singles.append([path])
+        else:
+            groups.setdefault(value, []).append(path)
+    return list(groups.values()) + singles
+
+
+def find_duplicate_files(paths: List[str], same_name: bool = False) -> List[List[str]]:
+    """按内容查找重复文件，返回分组列表，每组第一个文件为代表
+
+    依次按文件大小、头尾快速哈希分组，只有快速哈希也相同且文件大于头尾读取范围时
+    才计算全文哈希确认，绝大多数文件只需一次 stat。
+    same_name 为 True 时只有文件名也相同才视为重复（更新元数据时 um 会根据文件名补全标题）。
+    """
+    def file_size(path):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return None
+        return (os.path.normcase(os.path.basename(path)), size) if same_name else size
+
+    def byte_size(path):
+        key = file_size(path)
+        return key[1] if same_name else key
+
+    result = []
+    for size_group in _group_by(paths, file_size):
+        if len(size_group) == 1:
+            result.append(size_group)
+            continue
+        for partial_group in _group_by(size_group, lambda p: _hash_file(p, partial=True)):
+            if len(partial_group) == 1 or byte_size(partial_group[0]) <= 2 * PARTIAL_HASH_SIZE:
+                result.append(partial_group)
+                continue
+            result.extend(_group_by(partial_group, lambda p: _hash_file(p, partial=False)))
+
+    # 按代表文件在原列表中的顺序输出
+    order = {path: i for i, path in enumerate(paths)}
+    for group in result:
+        group.sort(key=order.__getitem__)
+    result.sort(key=lambda group: order[group[0]])
+    return result
+
+
+class BatchStats:
+    """批处理吞吐量统计，工作线程在任务开始/结束时更新，界面线程读取快照"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset(0)
+
+    def reset(self, total: int):
+        with self._lock:
+            self.total = total
+            self.completed = 0
+            self.failed = 0
+            self.bytes_done = 0
+            self.active = 0
+            self.start_time = time.perf_counter()
+
+    def job_started(self):
+        with self._lock:
+            self.active += 1
+
+    def job_finished(self, files: int, succeeded: int, nbytes: int, was_active: bool = True):
+        """was_active 为 False 时任务此前已不计入活动数（如租约过期后迟到的结果）"""
+        with self._lock:
+            if was_active:
+                self.active = max(0, self.active - 1)
+            self.completed += files
+            self.failed += files - succeeded
+            self.bytes_done += nbytes
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回当前统计：已完成数、失败数、活动任务数、文件/s、MB/s、预计剩余秒数"""
+        with self._lock:
+            elapsed = max(time.perf_counter() - self.start_time, 1e-6)
+            files_per_sec = self.completed / elapsed
+            remaining = self.total - self.completed
+            return {
+                'total': self.total,
+                'completed': self.completed,
+                'failed': self.failed,
+                'active': self.active,
+                'files_per_sec': files_per_sec,
+                'mbps': self.bytes_done / elapsed / (1024 * 1024),
+                'eta': remaining / files_per_sec if files_per_sec > 0 else None,
+            }
+
+
+class BatchProfiler:
+    """批处理性能分析（设置环境变量 UNLOCK_MUSIC_PROFILE 启用）
+
+    一次批处理期间收集：各线程的 cProfile 数据（合并为一个 .pstats 文件）、
+    tracemalloc 内存统计、Tk 事件循环延迟（root.after(0, ...) 从调度到执行的时间）
+    以及每个任务的耗时和 CPU 时间，另写一份 JSON 摘要便于附在问题反馈中。
+    """
+
+    ENV_VAR = "UNLOCK_MUSIC_PROFILE"
+    # 事件循环延迟采样间隔（秒）
+    LATENCY_SAMPLE_INTERVAL = 0.2
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = Path(output_dir)
+        self._lock = threading.Lock()
+        self._profiles: List[cProfile.Profile] = []
+        # 每个线程只创建一个 Profile，同一线程上的多个任务累加到同一对象
+        self._local = threading.local()
+        self._main_profile: Optional[cProfile.Profile] = None
+        self._jobs: List[Dict[str, Any]] = []
+        self._latencies: List[float] = []
+        self._sampler_stop = threading.Event()
+        self._start_time = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["BatchProfiler"]:
+        """根据环境变量创建：值为目录时输出到该目录，否则输出到配置目录下的 profiles"""
+        value = os.environ.get(cls.ENV_VAR, "").strip()
+        if not value or value == "0":
+            return None
+        if value != "1" and os.path.isdir(value):
+            return cls(Path(value))
+        return cls(default_journal_path().parent / "profiles")
+
+    def start(self, root: tk.Tk):
+        """开始分析（主线程调用）"""
+        with self._lock:
+            self._profiles = []
+            self._jobs = []
+            self._latencies = []
+        self._local = threading.local()
+        self._start_time = time.perf_counter()
+        tracemalloc.start()
+        self._main_profile = self._enable_profile()
+
+        self._sampler_stop.clear()
+        threading.Thread(target=self._sample_latency, args=(root,), daemon=True,
+                         name="profiler").start()
+
+    def wrap(self, func: Callable) -> Callable:
+        """包装在后台线程中运行的函数，使该线程的调用也被 cProfile 记录
+
+        同一线程复用一个 Profile：每次调用时启用、返回时停用，数据在该对象中累加。
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            local = self._local
+            profile = getattr(local, 'profile', None)
+            if profile is None:
+                profile = self._enable_profile()
+                if profile is None:
+                    return func(*args, **kwargs)
+                local.profile = profile
+                with self._lock:
+                    self._profiles.append(profile)
+            else:
+                profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.disable()
+        return wrapper
+
+    def record_job(self, path: str, wall_time: float, um_cpu_time: Optional[float], nbytes: int,
+                   files: int, succeeded: int):
+        """记录单个任务的耗时；um_cpu_time 为 um 子进程的 CPU 时间，无法获取时为 None"""
+        with self._lock:
+            self._jobs.append({
+                'path': path,
+                'wall_time': round(wall_time, 4),
+                'um_cpu_time': round(um_cpu_time, 4) if um_cpu_time is not None else None,
+                'bytes': nbytes,
+                'files': files,
+                'succeeded': succeeded,
+            })
+
+    def stop(self) -> Tuple[Path, Path]:
+        """结束分析并写出 .pstats 和 JSON 摘要（主线程调用），返回两个文件路径"""
+        self._sampler_stop.set()
+        if self._main_profile:
+            self._main_profile.disable()
+            with self._lock:
+                self._profiles.append(self._main_profile)
+            self._main_profile = None
+
+        wall_time = time.perf_counter() - self._start_time
+        current, peak = tracemalloc.get_traced_memory()
+        top_alloc = tracemalloc.take_snapshot().statistics('lineno')[:20]
+        tracemalloc.stop()
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = time.strftime("profile-%Y%m%d-%H%M%S")
+        pstats_path = self.output_dir / f"{stem}.pstats"
+        summary_path = self.output_dir / f"{stem}.json"
+
+        with self._lock:
+            profiles = list(self._profiles)
+            jobs = list(self._jobs)
+            latencies = sorted(self._latencies)
+
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(str(pstats_path))
+
+        # stats.stats: (文件, 行号, 函数名) -> (原始调用次数, 调用次数, 自身耗时, 累计耗时, 调用者)
+        top_functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:30]
+
+        summary = {
+            'python': sys.version,
+            'platform': platform.platform(),
+            'wall_time': round(wall_time, 3),
+            'threads_profiled': len(profiles),
+            'pstats_file': pstats_path.name,
+            'top_functions': [
+                {'function': f"{filename}:{line}({name})", 'calls': calls,
+                 'tottime': round(tottime, 4), 'cumtime': round(cumtime, 4)}
+                for (filename, line, name), (_, calls, tottime, cumtime, _) in top_functions
+            ],
+            'event_loop_latency_ms': self._summarize_latency(latencies),
+            'memory': {
+                'current_bytes': current,
+                'peak_bytes': peak,
+                'top_allocations': [
+                    {'location': str(stat.traceback), 'size_bytes': stat.size, 'count': stat.count}
+                    for stat in top_alloc
+                ],
+            },
+            'jobs': jobs,
+        }
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return pstats_path, summary_path
+
+    def _enable_profile(self) -> Optional[cProfile.Profile]:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ 的 cProfile 基于 sys.monitoring，同一时间只能启用一个，且已覆盖所有线程
+            return None
+        return profile
+
+    def _sample_latency(self, root: tk.Tk):
+        """定期向事件循环投递空回调，记录从调度到执行的延迟"""
+        while not self._sampler_stop.wait(self.LATENCY_SAMPLE_INTERVAL):
+            scheduled = time.perf_counter()
+            try:
+                root.after(0, lambda t=scheduled: self._record_latency(time.perf_counter() - t))
+            except (RuntimeError, tk.TclError):
+                break
+
+    def _record_latency(self, seconds: float):
+        with self._lock:
+            self._latencies.append(seconds * 1000)
+
+    @staticmethod
+    def _summarize_latency(latencies: List[float]) -> Dict[str, Any]:
+        if not latencies:
+            return {'samples': 0}
+
+        def percentile(q):
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 3)
+
+        return {
+            'samples': len(latencies),
+            'mean': round(sum(latencies) / len(latencies), 3),
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'max': round(latencies[-1], 3),
+        }
+
+
 class UnlockMusicGUI:
     """音乐解密工具GUI主类"""
 
@@ -81,11 +632,36 @@ class UnlockMusicGUI:
         self.supported_label_var = tk.StringVar(value="🎵 支持格式: 读取中...")
 
 
+        # 并发调度：总工作线程数，以及每个存储设备（NAS/机械硬盘等）的并发上限
+        self.max_workers = tk.IntVar(value=min(4, os.cpu_count() or 1))
+        self.source_io_limit = tk.IntVar(value=2)
+        self.dest_io_limit = tk.IntVar(value=0)  # 0 表示不限（只受并发任务数限制）
+        self.auto_tune_io = tk.BooleanVar(value=True)
+        # 单独设置的磁盘并发上限，格式: 路径=上限; 路径=上限
+        self.device_limit_overrides = tk.StringVar(value="")
+        # 分布式处理：本机作为任务服务器，由其他机器上的 worker 领取任务
+        self.distributed = tk.BooleanVar(value=False)
+        self.job_server_host = tk.StringVar(value="0.0.0.0")
+        self.job_server_port = tk.IntVar(value=DEFAULT_PORT)
+        # worker 需要提供相同的令牌才能领取任务
+        self.job_server_token = tk.StringVar(value=os.environ.get(TOKEN_ENV_VAR) or secrets.token_urlsafe(12))
+
         self.file_queue = []  # 待处理文件队列
         self.is_processing = False
+        # 后台处理线程是否仍在运行（停止后需等待进行中的任务结束才能开始新批次）
+        self.batch_running = False
+        # 批处理日志，用于中断后恢复
+        self.journal = BatchJournal(default_journal_path())
+        # 性能分析（仅在设置环境变量时启用）
+        self.profiler = BatchProfiler.from_env()
+
+        # 吞吐量状态面板：由任务完成事件驱动刷新，另有一个低频定时器更新耗时/ETA
+        self.batch_stats = BatchStats()
+        self.dashboard_var = tk.StringVar(value="")
+        self._dashboard_pending = False
+        self._dashboard_timer = None
 
         # 动画相关变量
-        self.animation_running = False
         self.fade_alpha = 0.0
         self.status_colors = {
             'idle': '#2E8B57',      # 海绿色
@@ -181,6 +757,39 @@ class UnlockMusicGUI:
         ttk.Checkbutton(options_frame, text="覆盖已存在文件", variable=self.overwrite).pack(side=tk.LEFT, padx=(0, 20))
         ttk.Checkbutton(options_frame, text="详细日志", variable=self.verbose).pack(side=tk.LEFT)
 
+        # 并发设置
+        concurrency_frame = ttk.Frame(settings_frame)
+        concurrency_frame.grid(row=3, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+
+        ttk.Label(concurrency_frame, text="并发任务数:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Spinbox(concurrency_frame, from_=1, to=32, width=4, textvariable=self.max_workers).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Label(concurrency_frame, text="源磁盘并发上限:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Spinbox(concurrency_frame, from_=1, to=32, width=4, textvariable=self.source_io_limit).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Label(concurrency_frame, text="输出磁盘并发上限(0=不限):").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Spinbox(concurrency_frame, from_=0, to=32, width=4, textvariable=self.dest_io_limit).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Checkbutton(concurrency_frame, text="按实测速度自动调节", variable=self.auto_tune_io).pack(side=tk.LEFT)
+
+        # 单独设置某些磁盘的并发上限（固定值，不参与自动调节）
+        override_frame = ttk.Frame(settings_frame)
+        override_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        override_frame.columnconfigure(1, weight=1)
+
+        ttk.Label(override_frame, text="单独设置磁盘（路径=上限; ...）:").grid(row=0, column=0, sticky=tk.W, padx=(0, 5))
+        ttk.Entry(override_frame, textvariable=self.device_limit_overrides).grid(row=0, column=1, sticky=(tk.W, tk.E))
+
+        # 分布式处理设置
+        distributed_frame = ttk.Frame(settings_frame)
+        distributed_frame.grid(row=5, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+
+        ttk.Checkbutton(distributed_frame, text="分布式处理（分发给其他机器上的 worker）",
+                        variable=self.distributed).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Label(distributed_frame, text="监听地址:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Entry(distributed_frame, width=15, textvariable=self.job_server_host).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Label(distributed_frame, text="服务端口:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Entry(distributed_frame, width=6, textvariable=self.job_server_port).pack(side=tk.LEFT, padx=(0, 20))
+        ttk.Label(distributed_frame, text="访问令牌:").pack(side=tk.LEFT, padx=(0, 5))
+        ttk.Entry(distributed_frame, width=18, textvariable=self.job_server_token).pack(side=tk.LEFT)
+
     def create_file_list_area(self, parent):
         """创建文件列表区域"""
         list_frame = ttk.LabelFrame(parent, text="待处理文件", padding="5")
@@ -230,6 +839,10 @@ class UnlockMusicGUI:
         self.progress = ttk.Progressbar(control_frame, mode='determinate')
         self.progress.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(10, 0))
 
+        # 吞吐量状态面板
+        ttk.Label(parent, textvariable=self.dashboard_var, anchor="w").grid(
+            row=5, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+
     def load_supported_extensions(self):
         """调用 CLI 获取支持的扩展名，并更新过滤/扫描集合"""
         try:
@@ -305,38 +918,7 @@ class UnlockMusicGUI:
 
     def find_um_executable(self) -> Optional[str]:
         """查找um.exe可执行文件"""
-        candidates = []
-
-        # 打包后的环境 - 优先查找顺序
-        if getattr(sys, 'frozen', False):
-            # 1. PyInstaller 临时目录 (_MEIPASS)
-            if hasattr(sys, '_MEIPASS'):
-                candidates.append(os.path.join(sys._MEIPASS, "um.exe"))
-
-            # 2. exe 同目录
-            exe_dir = os.path.dirname(sys.executable)
-            candidates.append(os.path.join(exe_dir, "um.exe"))
-
-        # 开发环境
-        candidates.extend([
-            "./um.exe",
-            "./um",
-            "um.exe",
-            "um"
-        ])
-
-        # 逐一检查候选路径
-        for path in candidates:
-            if os.path.isfile(path):
-                try:
-                    # 验证文件可执行性
-                    if os.access(path, os.X_OK) or path.endswith('.exe'):
-                        return os.path.abspath(path)
-                except:
-                    continue
-
-        # 如果没找到，记录但不立即报错（延迟到使用时）
-        return None
+        return find_um_executable()
 
     def browse_files(self):
         """浏览并选择文件"""
@@ -450,7 +1032,7 @@ class UnlockMusicGUI:
             messagebox.showerror("错误", "未找到um.exe程序，请检查程序是否存在")
             return
 
-        if self.is_processing:
+        if self.is_processing or self.batch_running:
             return
 
         # 创建输出目录
@@ -458,82 +1040,472 @@ class UnlockMusicGUI:
         output_path.mkdir(parents=True, exist_ok=True)
 
         self.is_processing = True
+        self.batch_running = True
         self.start_btn.config(state="disabled")
         self.stop_btn.config(state="normal")
         self.progress.config(maximum=len(self.file_queue), value=0)
 
         # 更新状态指示器
         self.update_status_indicator('processing', '处理中')
-        self.animate_status_indicator('processing')
 
-        # 启动进度条动画
-        self.animate_progress_bar()
+        # 启动状态面板
+        self.batch_stats.reset(len(self.file_queue))
+        self._refresh_dashboard()
+
+        if self.profiler:
+            self.profiler.start(self.root)
 
         # 在新线程中处理文件
-        processing_thread = threading.Thread(target=self._process_files, daemon=True)
+        processing_thread = threading.Thread(target=self._run_batch, daemon=True)
         processing_thread.start()
 
     def stop_processing(self):
         """停止处理"""
         self.is_processing = False
-        self.start_btn.config(state="normal")
+        # 进行中的任务结束后由 _processing_completed 恢复"开始处理"按钮，
+        # 避免新批次与旧批次的任务同时运行、共用统计
         self.stop_btn.config(state="disabled")
-        self.update_status_indicator('idle', '已停止')
-        self.log_message("⏹️ 处理已停止")
+        self.update_status_indicator('idle', '正在停止')
+        self.log_message("⏹️ 正在停止，等待进行中的任务结束...")
+
+    def _run_batch(self):
+        """后台处理线程入口"""
+        try:
+            self._profiled(self._process_files)()
+        finally:
+            # 在本线程的性能分析数据收集完毕后再通知界面，_processing_completed 会结束性能分析
+            self.root.after(0, self._processing_completed)
 
     def _process_files(self):
         """处理文件（在后台线程中运行）"""
         total_files = len(self.file_queue)
+        self.journal.start_batch(list(self.file_queue), self._batch_options())
+
+        # 内容相同的文件只解密代表文件，其余直接复用输出
+        duplicates: Dict[str, List[str]] = {}
+        for group in find_duplicate_files(list(self.file_queue), same_name=self.update_metadata.get()):
+            duplicates[group[0]] = group[1:]
+        duplicate_count = total_files - len(duplicates)
+        if duplicate_count:
+            self.log_message(f"🔁 发现 {duplicate_count} 个重复文件，相同内容只解密一次")
+
+        if self.distributed.get():
+            processed = self._dispatch_distributed(duplicates)
+        else:
+            processed = self._dispatch_local(duplicates)
+
+        self.journal.finish()
+        self.log_message(f"🎉 处理完成! 成功: {processed}/{total_files}")
+
+    def _dispatch_local(self, duplicates: Dict[str, List[str]]) -> int:
+        """在本机并发处理，返回成功的文件数
+
+        任务按源文件和输出目录所在设备分组，由 DeviceIOLimiter 控制每个设备上的并发数，
+        工作线程总数由"并发任务数"决定。
+        """
+        max_workers = max(1, self._get_int_setting(self.max_workers, 1))
+        source_limit = self._get_int_setting(self.source_io_limit, 2)
+        dest_limit = self._get_int_setting(self.dest_io_limit, 0) or max_workers
+
+        # 按设备组合分组，派发时只需检查每组的队首任务
+        groups: Dict[frozenset, List[str]] = {}
+        source_devices = set()
+        dest_devices = set()
+        for file_path in duplicates:
+            source_dev = get_device_id(file_path)
+            dest_dev = get_device_id(self._resolve_output_dir(file_path))
+            source_devices.add(source_dev)
+            dest_devices.add(dest_dev)
+            groups.setdefault(frozenset((source_dev, dest_dev)), []).append(file_path)
+
+        # 输出盘使用输出盘上限；同时作为源盘的设备按较慢的源盘处理
+        initial_limits = {dev: dest_limit for dev in dest_devices}
+        initial_limits.update({dev: source_limit for dev in source_devices})
+        limiter = DeviceIOLimiter(
+            default_limit=source_limit,
+            max_limit=max_workers,
+            auto_tune=self.auto_tune_io.get(),
+            limits=self._device_limit_overrides(),
+            initial_limits=initial_limits,
+            on_adjust=lambda dev, limit, mbps: self.log_message(
+                f"⚙️ 设备 {dev} 实测 {mbps:.1f} MB/s，并发上限调整为 {limit}")
+        )
+        pending = {devices: iter(paths) for devices, paths in groups.items()}
+        remaining = {devices: len(paths) for devices, paths in groups.items()}
+
         processed = 0
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="worker") as executor:
+            running: Dict[Any, int] = {}  # future -> 该任务包含的文件数
+            while running or (self.is_processing and pending):
+                # 在工作线程未满时，派发设备配额尚有空闲的任务
+                while self.is_processing and pending and len(running) < max_workers:
+                    devices = next((d for d in pending if limiter.try_acquire(d)), None)
+                    if devices is None:
+                        break
+                    file_path = next(pending[devices])
+                    remaining[devices] -= 1
+                    if not remaining[devices]:
+                        del pending[devices]
+                    future = executor.submit(self._profiled(self._run_job), file_path, duplicates[file_path], devices, limiter)
+                    running[future] = 1 + len(duplicates[file_path])
+
+                if not running:
+                    continue
 
-        for i, file_path in enumerate(self.file_queue):
-            if not self.is_processing:
-                break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    processed += future.result()
+                self._notify_dashboard()
+        return processed
+
+    def _dispatch_distributed(self, duplicates: Dict[str, List[str]]) -> int:
+        """作为任务服务器把文件分发给 worker 处理，返回成功的文件数
+
+        worker 与本机共享存储，重复文件的输出仍由本机在代表文件完成后生成。
+        """
+        lock = threading.Lock()
+        processed = [0]
+
+        def on_lease(job, worker):
+            self.batch_stats.job_started()
+            self.journal.record(job['path'], 'running', output_dir=job['output_dir'],
+                                started=time.time(), worker=worker)
+            self.log_message(f"🔄 [{worker}] 正在处理: {os.path.basename(job['path'])}")
+
+        def on_complete(job, result, worker):
+            succeeded = self._finish_remote_job(job, result, worker, duplicates[job['path']])
+            with lock:
+                processed[0] += succeeded
+
+        def on_retry(job, result, worker):
+            if not result['late']:
+                self.batch_stats.job_finished(0, 0, 0)
+                self._notify_dashboard()
+            self.log_message(f"⚠️ [{worker}] 处理失败，交给其他 worker 重试: "
+                             f"{os.path.basename(job['path'])} - {result['reason']}")
+
+        def on_expire(job, worker):
+            if job['state'] == 'failed':
+                on_complete(job, {'success': False, 'reason': "worker 租约多次过期", 'output_path': None,
+                                  'wall_time': 0.0, 'cpu_time': None, 'bytes': 0}, worker)
+            else:
+                self.batch_stats.job_finished(0, 0, 0)
+                self._notify_dashboard()
+                self.log_message(f"⚠️ [{worker}] 租约过期，重新排队: {os.path.basename(job['path'])}")
+
+        token = self.job_server_token.get().strip()
+        server = JobServer(host=self.job_server_host.get().strip() or "0.0.0.0",
+                           port=self._get_int_setting(self.job_server_port, DEFAULT_PORT),
+                           token=token, on_lease=on_lease, on_complete=on_complete, on_retry=on_retry,
+                           on_expire=on_expire)
+        # 先提交全部任务再启动服务，否则带 --exit-when-idle 的 worker 可能在队列为空时就退出
+        args = self._um_args()
+        for file_path in duplicates:
+            server.submit(file_path, self._resolve_output_dir(file_path), args)
+        try:
+            server.start()
+        except (OSError, ValueError) as e:
+            self.log_message(f"❌ 任务服务器启动失败: {e}")
+            return 0
+
+        address = server.host
+        if address in ("0.0.0.0", "::"):
+            try:
+                address = socket.gethostbyname(socket.gethostname())
+            except OSError:
+                address = "本机IP"
+        token_arg = f" --token {token}" if token else ""
+        self.log_message(f"🌐 任务服务器已启动，在其他机器上运行: "
+                         f"python job_server.py worker --server http://{address}:{server.port} --um <um路径>{token_arg}")
+
+        disabled = set()
+        try:
+            while not server.wait(timeout=1.0):
+                if not self.is_processing:
+                    # 停止后不再分配新任务，等待已分配的任务结束
+                    server.cancel_queued()
+                for stat in server.worker_stats():
+                    if stat['disabled'] and stat['worker'] not in disabled:
+                        disabled.add(stat['worker'])
+                        self.log_message(f"⚠️ [{stat['worker']}] 连续处理失败，已停止向其分配任务；"
+                                         f"没有其他 worker 时剩余任务会一直排队，可启动新的 worker 或停止处理")
+        finally:
+            for stat in server.worker_stats():
+                note = "（连续失败，已停止分配）" if stat['disabled'] else ""
+                self.log_message(f"📊 [{stat['worker']}] 成功 {stat['succeeded']} 个，失败 {stat['failed']} 个，"
+                                 f"{stat['files_per_sec']:.2f} 文件/s，{stat['mbps']:.1f} MB/s{note}")
+            server.stop()
+        return processed[0]
+
+    def _finish_remote_job(self, job: Dict[str, Any], result: Dict[str, Any], worker: str,
+                           duplicates: List[str]) -> int:
+        """处理 worker 上报的结果，生成重复文件输出，返回成功的文件数"""
+        file_path = job['path']
+        succeeded = 0
+        if result['success']:
+            self.log_message(f"✅ [{worker}] 处理成功: {os.path.basename(file_path)}")
+            self.journal.record(file_path, 'done', worker=worker)
+            succeeded += 1
+        else:
+            self.log_message(f"❌ [{worker}] 处理失败: {os.path.basename(file_path)} - {result['reason']}")
+            self.journal.record(file_path, 'failed', reason=result['reason'], worker=worker)
+
+        for duplicate in duplicates:
+            if self._reuse_output(file_path, result['output_path'] if result['success'] else None, duplicate):
+                succeeded += 1
+
+        nbytes = result['bytes'] * (1 + len(duplicates))
+        self.batch_stats.job_finished(1 + len(duplicates), succeeded, nbytes,
+                                      was_active=not result.get('late', False))
+        self._notify_dashboard()
+        if self.profiler:
+            self.profiler.record_job(file_path, result['wall_time'], result['cpu_time'], result['bytes'],
+                                     1 + len(duplicates), succeeded)
+        return succeeded
+
+    def _run_job(self, file_path: str, duplicates: List[str], devices: frozenset,
+                 limiter: DeviceIOLimiter) -> int:
+        """在工作线程中处理单个文件及其重复文件，结束后释放设备配额，返回成功的文件数"""
+        self.log_message(f"🔄 正在处理: {os.path.basename(file_path)}")
+        self.batch_stats.job_started()
+        wall_start = time.perf_counter()
+        try:
+            nbytes = os.path.getsize(file_path)
+        except OSError:
+            nbytes = 0
+
+        output_dir = None
+        started = time.time()
+        success = False
+        succeeded = 0
+        um_cpu_time = None
+        # job_started() 之后的步骤都在 try 内，任何异常都会释放设备配额并结束活动计数
+        try:
+            output_dir = self._resolve_output_dir(file_path)
+            self.journal.record(file_path, 'running', output_dir=output_dir, started=started)
 
-            self.log_message(f"🔄 正在处理: {os.path.basename(file_path)}")
+            success, reason, output_path, um_cpu_time = self._process_single_file(file_path)
+            if success:
+                self.log_message(f"✅ 处理成功: {os.path.basename(file_path)}")
+            else:
+                self.log_message(f"❌ 处理失败: {os.path.basename(file_path)}")
+
+            if success:
+                self.journal.record(file_path, 'done')
+                succeeded += 1
+            else:
+                self.journal.record(file_path, 'failed', reason=reason,
+                                    output_dir=output_dir, started=started)
 
+            for duplicate in duplicates:
+                if self._reuse_output(file_path, output_path if success else None, duplicate):
+                    succeeded += 1
+        except Exception as e:
+            reason = str(e)
+            self.log_message(f"❌ 处理出错: {os.path.basename(file_path)} - {reason}")
             try:
-                success = self._process_single_file(file_path)
-                if success:
-                    self.log_message(f"✅ 处理成功: {os.path.basename(file_path)}")
-                    processed += 1
-                else:
-                    self.log_message(f"❌ 处理失败: {os.path.basename(file_path)}")
+                self.journal.record(file_path, 'failed', reason=reason,
+                                    output_dir=output_dir, started=started)
+            except OSError:
+                # 日志本身写入失败（如磁盘已满）时不影响批次中的其他任务
+                pass
+        finally:
+            # 重复文件由输出硬链接或复制生成，不读取源磁盘，只按实际解密的字节数计入磁盘速度
+            limiter.release(devices, nbytes)
+            self.batch_stats.job_finished(1 + len(duplicates), succeeded, nbytes * (1 + len(duplicates)))
+            if self.profiler:
+                self.profiler.record_job(file_path, time.perf_counter() - wall_start,
+                                         um_cpu_time, nbytes,
+                                         1 + len(duplicates), succeeded)
+        return succeeded
+
+    def _profiled(self, func: Callable) -> Callable:
+        """性能分析模式下让后台线程中的调用也被记录"""
+        return self.profiler.wrap(func) if self.profiler else func
+
+    def _notify_dashboard(self):
+        """任务完成事件：请求在主线程刷新状态面板，多个事件合并为一次刷新"""
+        if self._dashboard_pending:
+            return
+        self._dashboard_pending = True
+        self.root.after(0, self._refresh_dashboard)
+
+    def _refresh_dashboard(self):
+        """刷新进度条和状态面板（主线程调用）"""
+        self._dashboard_pending = False
+        stats = self.batch_stats.snapshot()
+        self.progress.config(value=stats['completed'])
+
+        eta = stats['eta']
+        if eta is None:
+            eta_text = "--:--:--"
+        else:
+            # 按小时总数显示，超过 24 小时也不会回绕
+            eta = int(eta)
+            eta_text = f"{eta // 3600:02d}:{eta % 3600 // 60:02d}:{eta % 60:02d}"
+        self.dashboard_var.set(
+            f"📊 {stats['completed']}/{stats['total']}  |  {stats['files_per_sec']:.2f} 文件/s  |  "
+            f"{stats['mbps']:.1f} MB/s  |  剩余 {eta_text}  |  "
+            f"工作线程 {stats['active']}  |  失败 {stats['failed']}"
+        )
 
-            except Exception as e:
-                self.log_message(f"❌ 处理出错: {os.path.basename(file_path)} - {str(e)}")
+        # 处理期间每秒刷新一次，使耗时和 ETA 在没有任务完成时也能更新
+        if self._dashboard_timer is not None:
+            self.root.after_cancel(self._dashboard_timer)
+            self._dashboard_timer = None
+        if self.is_processing:
+            self._dashboard_timer = self.root.after(1000, self._refresh_dashboard)
+
+    def _reuse_output(self, source: str, output_path: Optional[str], duplicate: str) -> bool:
+        """为内容相同的重复文件生成输出：优先硬链接，跨设备或不支持时复制"""
+        output_dir = self._resolve_output_dir(duplicate)
+        started = time.time()
+        self.journal.record(duplicate, 'running', output_dir=output_dir, started=started)
+
+        if not output_path or not os.path.isfile(output_path):
+            reason = f"代表文件 {os.path.basename(source)} 未生成输出"
+            self.log_message(f"❌ 处理失败: {os.path.basename(duplicate)} - {reason}")
+            self.journal.record(duplicate, 'failed', reason=reason, output_dir=output_dir, started=started)
+            return False
 
-            # 更新进度条
-            self.root.after(0, lambda v=i+1: self.progress.config(value=v))
+        # 输出文件名 = 源文件名去掉解密器后缀 + 音频扩展名，与 um 的命名规则一致
+        out_stem, audio_ext = os.path.splitext(os.path.basename(output_path))
+        source_suffix = os.path.basename(source)[len(out_stem):]
+        name = os.path.basename(duplicate)
+        if source_suffix and name.endswith(source_suffix):
+            name = name[:-len(source_suffix)]
+        else:
+            name = os.path.splitext(name)[0]
+        target = os.path.join(output_dir, name + audio_ext)
 
-        # 处理完成
-        self.root.after(0, self._processing_completed)
-        self.log_message(f"🎉 处理完成! 成功: {processed}/{total_files}")
+        try:
+            same_file = os.path.normcase(os.path.abspath(target)) == os.path.normcase(os.path.abspath(output_path))
+            if not same_file and (self.overwrite.get() or not os.path.exists(target)):
+                os.makedirs(output_dir, exist_ok=True)
+                if os.path.exists(target):
+                    os.remove(target)
+                try:
+                    os.link(output_path, target)
+                except OSError:
+                    # 与 um 相同，先写入临时文件再重命名，中断时不会留下不完整的输出
+                    partial = os.path.join(output_dir, f".{name}.unlocking{audio_ext}")
+                    shutil.copyfile(output_path, partial)
+                    os.replace(partial, target)
+            if self.remove_source.get():
+                os.remove(duplicate)
+        except OSError as e:
+            self.log_message(f"❌ 处理出错: {os.path.basename(duplicate)} - {e}")
+            self.journal.record(duplicate, 'failed', reason=str(e), output_dir=output_dir, started=started)
+            return False
+
+        self.log_message(f"✅ 处理成功（复用重复文件输出）: {os.path.basename(duplicate)}")
+        self.journal.record(duplicate, 'done')
+        return True
+
+    def _batch_options(self) -> Dict[str, Any]:
+        """当前批次的输出设置，写入批处理日志以便恢复时还原"""
+        return {
+            'output_dir': self.output_dir.get(),
+            'output_to_source': self.output_to_source.get(),
+        }
+
+    def offer_resume_batch(self):
+        """启动时检查上次未完成的批次，询问是否恢复"""
+        options, jobs = self.journal.load_unfinished()
+        if not jobs:
+            self.journal.discard()
+            return
+
+        # 无论是否恢复都清理不完整的输出文件，日志丢弃后就没有记录指向它们了
+        removed = sum(len(BatchJournal.cleanup_partial_outputs(job)) for job in jobs)
+        if removed:
+            self.log_message(f"🧹 已清理 {removed} 个不完整的输出文件")
+
+        failed = sum(1 for job in jobs if job.get('state') == 'failed')
+        if not messagebox.askyesno(
+            "恢复上次任务",
+            f"上次批处理未完成：{len(jobs) - failed} 个文件未处理，{failed} 个文件失败。\n是否恢复这些任务？"
+        ):
+            self.journal.discard()
+            return
+
+        # 还原上次的输出设置，保证续跑的文件输出到相同位置
+        if 'output_dir' in options:
+            self.output_dir.set(options['output_dir'])
+        if 'output_to_source' in options:
+            self.output_to_source.set(options['output_to_source'])
+            self.output_entry.config(state="disabled" if options['output_to_source'] else "normal")
+
+        finished = 0
+        files = []
+        for job in jobs:
+            if os.path.isfile(job['path']):
+                files.append(job['path'])
+            elif job.get('state') == 'running':
+                # 源文件已不存在：程序关闭后 um 仍完成了转换并按"删除源文件"移除了源文件
+                finished += 1
+
+        if finished:
+            self.log_message(f"✅ {finished} 个任务在程序关闭后已完成（源文件已删除），不再重新处理")
+        if files:
+            self.add_files_to_queue(files)
+        self.log_message(f"♻️ 已恢复上次未完成的任务: {len(files)} 个文件")
 
-    def _process_single_file(self, file_path: str) -> bool:
-        """处理单个文件"""
+    def _get_int_setting(self, var: tk.IntVar, default: int) -> int:
+        """读取整数设置，输入框内容无效时使用默认值"""
+        try:
+            return var.get()
+        except (tk.TclError, ValueError):
+            return default
+
+    def _device_limit_overrides(self) -> Dict[int, int]:
+        """解析单独设置的磁盘并发上限（路径=上限，以分号或换行分隔），返回 设备号 -> 上限"""
+        overrides = {}
+        for item in self.device_limit_overrides.get().replace("\n", ";").split(";"):
+            if not item.strip():
+                continue
+            path, sep, value = item.strip().rpartition("=")
+            try:
+                limit = int(value)
+            except ValueError:
+                limit = 0
+            if not sep or limit < 1 or not os.path.exists(path.strip()):
+                self.log_message(f"⚠️ 忽略无效的磁盘并发设置: {item.strip()}")
+                continue
+            overrides[get_device_id(path.strip())] = limit
+        return overrides
+
+    def _resolve_output_dir(self, file_path: str) -> str:
+        """根据输出到源文件夹选项决定输出目录"""
+        if self.output_to_source.get():
+            # 输出到源文件所在目录
+            return os.path.dirname(file_path)
+        # 输出到指定目录
+        return self.output_dir.get()
+
+    def _um_args(self) -> List[str]:
+        """根据处理选项生成 um 参数"""
+        args = []
+        if self.remove_source.get():
+            args.append("--remove-source")
+        if self.update_metadata.get():
+            args.append("--update-metadata")
+        if self.overwrite.get():
+            args.append("--overwrite")
+        if self.verbose.get():
+            args.append("--verbose")
+        return args
+
+    def _process_single_file(self, file_path: str) -> Tuple[bool, str, Optional[str], Optional[float]]:
+        """处理单个文件，返回 (是否成功, 失败原因, 输出文件路径, um 的 CPU 时间)"""
         try:
             # 构建um.exe命令
             cmd = [self.um_exe_path]
             cmd.extend(["-i", file_path])
 
-            # 根据输出到源文件夹选项决定输出目录
-            if self.output_to_source.get():
-                # 输出到源文件所在目录
-                source_dir = os.path.dirname(file_path)
-                cmd.extend(["-o", source_dir])
-            else:
-                # 输出到指定目录
-                cmd.extend(["-o", self.output_dir.get()])
-
-            if self.remove_source.get():
-                cmd.append("--remove-source")
-            if self.update_metadata.get():
-                cmd.append("--update-metadata")
-            if self.overwrite.get():
-                cmd.append("--overwrite")
-            if self.verbose.get():
-                cmd.append("--verbose")
+            cmd.extend(["-o", self._resolve_output_dir(file_path)])
+            cmd.extend(self._um_args())
 
             # 执行命令，隐藏cmd窗口
             startupinfo = None
@@ -542,10 +1514,8 @@ class UnlockMusicGUI:
                 startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
                 startupinfo.wShowWindow = subprocess.SW_HIDE
 
-            result = subprocess.run(
+            result, cpu_time = run_um(
                 cmd,
-                capture_output=True,
-                text=True,
                 timeout=300,  # 5分钟超时
                 startupinfo=startupinfo
             )
@@ -553,27 +1523,38 @@ class UnlockMusicGUI:
             if result.returncode == 0:
                 if self.verbose.get() and result.stdout:
                     self.log_message(f"📝 {result.stdout.strip()}")
-                return True
+                return True, "", parse_um_destination(result.stdout or ""), cpu_time
             else:
                 if result.stderr:
                     self.log_message(f"❌ 错误: {result.stderr.strip()}")
-                return False
+                return False, result.stderr.strip() if result.stderr else f"exit code {result.returncode}", None, cpu_time
 
         except subprocess.TimeoutExpired:
             self.log_message(f"⏰ 处理超时: {os.path.basename(file_path)}")
-            return False
+            return False, "timeout", None, None
         except Exception as e:
             self.log_message(f"❌ 异常: {str(e)}")
-            return False
+            return False, str(e), None, None
 
     def _processing_completed(self):
         """处理完成后的UI更新"""
+        stopped = not self.is_processing
         self.is_processing = False
+        self.batch_running = False
         self.start_btn.config(state="normal")
         self.stop_btn.config(state="disabled")
-        self.update_status_indicator('success', '完成')
+        self.update_status_indicator('idle' if stopped else 'success', '已停止' if stopped else '完成')
+        # 最终统计，同时停止状态面板定时器
+        self._refresh_dashboard()
+        if self.profiler:
+            try:
+                pstats_path, summary_path = self.profiler.stop()
+                self.log_message(f"📈 性能分析结果已保存: {pstats_path}, {summary_path}")
+            except Exception as e:
+                self.log_message(f"⚠️ 保存性能分析结果失败: {e}")
         # 添加完成动画
-        self.show_completion_animation()
+        if not stopped:
+            self.show_completion_animation()
 
     def show_startup_animation(self):
         """显示启动动画 - 窗口淡入效果"""
@@ -642,8 +1623,8 @@ class UnlockMusicGUI:
                                    fg="green", bg=self.root.cget('bg'))
             success_label.place(relx=0.5, rely=0.5, anchor="center")
 
-            # 让成功消息淡出
-            self.fade_out_success_message(success_label, 1.0)
+            # 2秒后移除成功消息
+            self.root.after(2000, success_label.destroy)
 
             # 让进度条变绿
             original_bg = self.progress.cget('background') if hasattr(self.progress, 'cget') else None
@@ -653,23 +1634,6 @@ class UnlockMusicGUI:
             print(f"动画效果失败: {e}")
             pass
 
-    def fade_out_success_message(self, label, alpha):
-        """成功消息淡出动画"""
-        try:
-            if alpha > 0:
-                # 模拟淡出效果（tkinter不直接支持alpha，使用颜色变化）
-                gray_value = int(255 * (1 - alpha))
-                color = f"#{gray_value:02x}{gray_value:02x}{gray_value:02x}"
-                label.config(fg=color)
-                self.root.after(50, lambda: self.fade_out_success_message(label, alpha - 0.05))
-            else:
-                label.destroy()
-        except:
-            try:
-                label.destroy()
-            except:
-                pass
-
     def reset_progress_style(self):
         """重置进度条样式"""
         try:
@@ -678,17 +1642,6 @@ class UnlockMusicGUI:
         except:
             pass
 
-    def animate_progress_bar(self):
-        """进度条动画效果"""
-        if self.is_processing:
-            # 添加一些视觉反馈
-            try:
-                current_value = self.progress['value']
-                # 可以添加一些波动效果
-                self.root.after(100, self.animate_progress_bar)
-            except:
-                pass
-
     def update_status_indicator(self, status, text):
         """更新状态指示器"""
         try:
@@ -697,23 +1650,6 @@ class UnlockMusicGUI:
         except:
             pass
 
-    def animate_status_indicator(self, status):
-        """状态指示器动画效果"""
-        if status == 'processing':
-            # 处理中的闪烁效果
-            self.blink_status_indicator()
-
-    def blink_status_indicator(self):
-        """状态指示器闪烁效果"""
-        if self.is_processing:
-            try:
-                current_color = self.status_label.cget('foreground')
-                new_color = self.status_colors['processing'] if current_color != self.status_colors['processing'] else '#FFB6C1'
-                self.status_label.config(foreground=new_color)
-                self.root.after(500, self.blink_status_indicator)
-            except:
-                pass
-
     def add_button_hover_effects(self):
         """为按钮添加悬停效果"""
         def on_enter(event, button):
@@ -745,10 +1681,19 @@ class UnlockMusicGUI:
         self.add_button_hover_effects()
         self.show_startup_animation()
 
+        # 检查是否有可恢复的批处理任务
+        self.root.after(200, self.offer_resume_batch)
+
         self.root.mainloop()
 
 def main():
     """主函数"""
+    # worker 模式：打包后的程序也可以作为分布式 worker 运行
+    if len(sys.argv) > 1 and sys.argv[1] == "worker":
+        import job_server
+        job_server.main()
+        return
+
     try:
         app = UnlockMusicGUI()
         app.run()
@@ -0,0 +1,735 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Unlock Music 分布式任务服务 - 多台机器协同解密
+GUI 作为任务服务器（协调者）通过 HTTP 分发文件任务，其他机器上的 worker 调用 um 处理
+共享存储上的文件。任务以租约形式分配，worker 处理期间定期发送心跳续约，
+租约过期（worker 崩溃、断网）的任务会重新排队。
+
+运行 worker:
+    python job_server.py worker --server http://192.168.1.10:8765 --um ./um --token <令牌>
+"""
+
+import os
+import sys
+import hmac
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_PORT = 8765
+# 共享密钥，服务器与 worker 设置相同的值后才接受请求；只监听本机地址时可以不设置
+TOKEN_ENV_VAR = "UNLOCK_MUSIC_JOB_TOKEN"
+LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+# 请求体大小上限，worker 的请求只有几百字节
+MAX_REQUEST_BYTES = 64 * 1024
+# 没有控制台时 worker 的输出写入此文件
+WORKER_LOG_FILE = "unlock-music-worker.log"
+# worker 只会把这些参数传给 um，避免远程传入任意参数
+ALLOWED_UM_ARGS = ("--remove-source", "--update-metadata", "--overwrite", "--verbose")
+
+
+def find_um_executable() -> Optional[str]:
+    """查找um.exe可执行文件（GUI 和 worker 共用）"""
+    candidates = []
+
+    # 打包后的环境 - 优先查找顺序
+    if getattr(sys, 'frozen', False):
+        # 1. PyInstaller 临时目录 (_MEIPASS)
+        if hasattr(sys, '_MEIPASS'):
+            candidates.append(os.path.join(sys._MEIPASS, "um.exe"))
+
+        # 2. exe 同目录
+        exe_dir = os.path.dirname(sys.executable)
+        candidates.append(os.path.join(exe_dir, "um.exe"))
+
+    # 开发环境
+    candidates.extend([
+        "./um.exe",
+        "./um",
+        "um.exe",
+        "um"
+    ])
+
+    # 逐一检查候选路径
+    for path in candidates:
+        if os.path.isfile(path):
+            try:
+                # 验证文件可执行性
+                if os.access(path, os.X_OK) or path.endswith('.exe'):
+                    return os.path.abspath(path)
+            except:
+                continue
+
+    # 如果没找到，记录但不立即报错（延迟到使用时）
+    return None
+
+
+def parse_um_destination(stdout: str) -> Optional[str]:
+    """从 um 的日志输出中解析输出文件路径
+
+    转换成功（successfully converted）和输出已存在跳过时，日志行末尾的 JSON 字段都带有 destination。
+    """
+    for line in reversed(stdout.splitlines()):
+        start = line.find('{')
+        if start < 0 or '"destination"' not in line:
+            continue
+        try:
+            fields = json.loads(line[start:])
+        except ValueError:
+            continue
+        if fields.get('destination'):
+            return fields['destination']
+    return None
+
+
+def run_um(cmd: List[str], timeout: float, startupinfo: Any = None
+           ) -> Tuple[subprocess.CompletedProcess, Optional[float]]:
+    """运行 um，返回 (CompletedProcess, 子进程 CPU 时间)，超时抛出 subprocess.TimeoutExpired
+
+    CPU 时间为 um 进程的用户态 + 内核态时间（秒）：POSIX 下由 os.wait4 回收子进程时取得，
+    Windows 下通过 GetProcessTimes 读取，无法获取时为 None。
+    """
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                            startupinfo=startupinfo)
+    if os.name == 'nt':
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.communicate()
+            raise
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr), _windows_process_cpu_time(proc)
+
+    # 不能用 communicate()：它会自行回收子进程，之后 wait4 就拿不到资源使用量
+    output: Dict[str, str] = {}
+
+    def read(name: str, stream):
+        with stream:
+            output[name] = stream.read()
+
+    readers = [threading.Thread(target=read, args=(name, stream), daemon=True)
+               for name, stream in (('stdout', proc.stdout), ('stderr', proc.stderr))]
+    for reader in readers:
+        reader.start()
+    deadline = time.monotonic() + timeout
+    for reader in readers:
+        reader.join(max(0.0, deadline - time.monotonic()))
+    timed_out = any(reader.is_alive() for reader in readers)
+    if timed_out:
+        proc.kill()
+        for reader in readers:
+            reader.join()
+
+    _, status, rusage = os.wait4(proc.pid, 0)
+    proc.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+    if timed_out:
+        raise subprocess.TimeoutExpired(cmd, timeout, output.get('stdout'), output.get('stderr'))
+    return (subprocess.CompletedProcess(cmd, proc.returncode, output.get('stdout', ''), output.get('stderr', '')),
+            rusage.ru_utime + rusage.ru_stime)
+
+
+def _is_inside(path: str, directory: str) -> bool:
+    """path 解析（含符号链接）后是否位于 directory 内"""
+    path = os.path.normcase(os.path.realpath(path))
+    directory = os.path.normcase(os.path.realpath(directory))
+    try:
+        return os.path.commonpath([path, directory]) == directory
+    except ValueError:  # Windows 下位于不同盘符
+        return False
+
+
+def _windows_process_cpu_time(proc: subprocess.Popen) -> Optional[float]:
+    """读取已结束进程的 CPU 时间（Windows），失败时返回 None"""
+    try:
+        import ctypes
+        from ctypes import wintypes
+        times = [wintypes.FILETIME() for _ in range(4)]  # 创建、退出、内核态、用户态
+        if not ctypes.windll.kernel32.GetProcessTimes(wintypes.HANDLE(int(proc._handle)),
+                                                      *(ctypes.byref(t) for t in times)):
+            return None
+    except (AttributeError, OSError, ValueError):
+        return None
+    kernel, user = ((t.dwHighDateTime << 32 | t.dwLowDateTime) for t in times[2:])
+    return (kernel + user) / 1e7  # FILETIME 单位为 100 纳秒
+
+
+class JobServer:
+    """任务服务器（协调者）
+
+    任务状态: queued -> leased -> done / failed。租约在 lease_seconds 内没有心跳即过期，
+    任务重新排队；worker 报告失败时，如果还有其他在线 worker 没有处理失败过该任务，
+    任务重新排队交给它们。超过 max_attempts 次仍未完成则标记为失败。
+    连续失败 max_worker_failures 次的 worker 不再分配任务（可能是 um 版本或共享存储有问题）。
+    监听非本机地址时必须设置 token，worker 通过 X-Job-Token 请求头携带。
+    回调均在 HTTP 处理线程或租约检查线程中调用：
+        on_lease(job, worker)            任务分配给 worker
+        on_complete(job, result, worker) worker 报告完成（result 含 success/reason/output_path 等，
+                                         late 为 True 表示租约过期后迟到的结果，此前已调用过 on_expire）
+        on_retry(job, result, worker)    worker 报告失败，任务重新排队交给其他 worker
+        on_expire(job, worker)           租约过期，任务重新排队或失败
+    """
+
+    def __init__(self, host: str = "0.0.0.0", port: int = DEFAULT_PORT, lease_seconds: float = 30.0,
+                 max_attempts: int = 3, max_worker_failures: int = 3, token: Optional[str] = None,
+                 on_lease: Optional[Callable[[Dict[str, Any], str], None]] = None,
+                 on_complete: Optional[Callable[[Dict[str, Any], Dict[str, Any], str], None]] = None,
+                 on_retry: Optional[Callable[[Dict[str, Any], Dict[str, Any], str], None]] = None,
+                 on_expire: Optional[Callable[[Dict[str, Any], str], None]] = None):
+        self.host = host
+        self.port = port
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_worker_failures = max_worker_failures
+        self.token = token if token is not None else os.environ.get(TOKEN_ENV_VAR) or None
+        self.on_lease = on_lease
+        self.on_complete = on_complete
+        self.on_retry = on_retry
+        self.on_expire = on_expire
+
+        self._cond = threading.Condition()
+        self._jobs: Dict[int, Dict[str, Any]] = {}
+        self._queue: "OrderedDict[int, None]" = OrderedDict()
+        self._leases: Dict[int, Tuple[str, float]] = {}  # job_id -> (worker, 过期时间)
+        self._workers: Dict[str, Dict[str, Any]] = {}
+        # 正在执行的完成/过期回调数，回调结束前 wait() 不返回
+        self._callbacks_running = 0
+        self._next_job_id = 1
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._stopped = threading.Event()
+
+    # ---- 协调者 API ----
+
+    def start(self):
+        """启动 HTTP 服务和租约检查线程，监听非本机地址且没有设置 token 时抛出 ValueError"""
+        if not self.token and self.host not in LOOPBACK_HOSTS:
+            raise ValueError(f"监听 {self.host} 时必须设置访问令牌")
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _JobRequestHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.job_server = self
+        self.port = self._httpd.server_address[1]
+        self._stopped.clear()
+        threading.Thread(target=self._httpd.serve_forever, daemon=True, name="job-server").start()
+        threading.Thread(target=self._reap_expired_leases, daemon=True, name="job-reaper").start()
+
+    def stop(self):
+        """停止服务"""
+        self._stopped.set()
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+        with self._cond:
+            self._cond.notify_all()
+
+    def submit(self, path: str, output_dir: str, args: List[str]) -> int:
+        """提交一个文件任务，返回任务编号"""
+        with self._cond:
+            job_id = self._next_job_id
+            self._next_job_id += 1
+            self._jobs[job_id] = {
+                'job_id': job_id,
+                'path': path,
+                'output_dir': output_dir,
+                'args': [arg for arg in args if arg in ALLOWED_UM_ARGS],
+                'state': 'queued',
+                'attempts': 0,
+                'failed_workers': [],
+            }
+            self._queue[job_id] = None
+            self._cond.notify_all()
+            return job_id
+
+    def cancel_queued(self) -> int:
+        """取消所有尚未分配的任务，返回取消的数量（已分配的任务继续执行）"""
+        with self._cond:
+            cancelled = len(self._queue)
+            for job_id in self._queue:
+                self._jobs[job_id]['state'] = 'cancelled'
+            self._queue.clear()
+            self._cond.notify_all()
+            return cancelled
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待所有任务结束（没有排队和已分配的任务），超时返回 False"""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: (not self._queue and not self._leases and not self._callbacks_running)
+                or self._stopped.is_set(), timeout)
+
+    def worker_stats(self) -> List[Dict[str, Any]]:
+        """各 worker 的吞吐量统计：files 为处理过的任务数（含失败），其中 succeeded 个成功、failed 个失败"""
+        now = time.time()
+        with self._cond:
+            stats = []
+            for name, worker in self._workers.items():
+                elapsed = 0.0
+                if worker['first_lease'] is not None:
+                    end = now if worker['active'] else worker['last_seen']
+                    elapsed = max(end - worker['first_lease'], 1e-6)
+                stats.append({
+                    'worker': name,
+                    'active': worker['active'],
+                    'files': worker['files'],
+                    'succeeded': worker['succeeded'],
+                    'failed': worker['failed'],
+                    'disabled': worker['disabled'],
+                    'bytes': worker['bytes'],
+                    'files_per_sec': worker['files'] / elapsed if elapsed else 0.0,
+                    'mbps': worker['bytes'] / elapsed / (1024 * 1024) if elapsed else 0.0,
+                    'last_seen': worker['last_seen'],
+                })
+            return stats
+
+    # ---- worker 请求处理（HTTP 线程调用） ----
+
+    def handle(self, action: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        """处理 worker 请求，返回 JSON 响应"""
+        if action == 'status':
+            with self._cond:
+                counts: Dict[str, int] = {}
+                for job in self._jobs.values():
+                    counts[job['state']] = counts.get(job['state'], 0) + 1
+            return {'jobs': counts, 'workers': self.worker_stats()}
+
+        worker = str(request.get('worker', ''))
+        if not worker:
+            raise ValueError("missing worker name")
+        if action == 'register':
+            with self._cond:
+                self._touch_worker(worker)
+            return {'lease_seconds': self.lease_seconds, 'heartbeat_interval': self.lease_seconds / 3}
+        if action == 'lease':
+            return self._lease(worker)
+        if action == 'heartbeat':
+            return self._heartbeat(worker, int(request.get('job_id', 0)))
+        if action == 'complete':
+            return self._complete(worker, request)
+        raise ValueError(f"unknown action: {action}")
+
+    def _touch_worker(self, worker: str) -> Dict[str, Any]:
+        """更新 worker 最后活动时间（调用方需持有锁）"""
+        info = self._workers.setdefault(worker, {
+            'active': 0, 'files': 0, 'succeeded': 0, 'failed': 0, 'bytes': 0, 'first_lease': None, 'last_seen': 0.0,
+            'consecutive_failures': 0, 'disabled': False,
+        })
+        info['last_seen'] = time.time()
+        return info
+
+    def _other_workers_available(self, job: Dict[str, Any], worker: str) -> bool:
+        """是否还有其他在线、未停用且没有处理失败过该任务的 worker（调用方需持有锁）"""
+        now = time.time()
+        return any(name != worker and name not in job['failed_workers'] and not info['disabled']
+                   and now - info['last_seen'] <= self.lease_seconds
+                   for name, info in self._workers.items())
+
+    def _lease(self, worker: str) -> Dict[str, Any]:
+        with self._cond:
+            info = self._touch_worker(worker)
+            if info['disabled']:
+                return {'job': None, 'idle': not self._queue and not self._leases, 'disabled': True}
+            if not self._queue:
+                return {'job': None, 'idle': not self._leases}
+            # 跳过该 worker 处理失败过的任务；能处理它们的 worker 都已离线时仍交给本 worker 重试
+            job_id = next((job_id for job_id in self._queue
+                           if worker not in self._jobs[job_id]['failed_workers']
+                           or not self._other_workers_available(self._jobs[job_id], worker)), None)
+            if job_id is None:
+                return {'job': None, 'idle': False}
+            del self._queue[job_id]
+            job = self._jobs[job_id]
+            job['state'] = 'leased'
+            job['attempts'] += 1
+            job['last_worker'] = worker
+            self._leases[job_id] = (worker, time.time() + self.lease_seconds)
+            info['active'] += 1
+            if info['first_lease'] is None:
+                info['first_lease'] = time.time()
+            leased = dict(job)
+
+        if self.on_lease:
+            self.on_lease(leased, worker)
+        return {'job': {key: leased[key] for key in ('job_id', 'path', 'output_dir', 'args')}}
+
+    def _heartbeat(self, worker: str, job_id: int) -> Dict[str, Any]:
+        with self._cond:
+            self._touch_worker(worker)
+            lease = self._leases.get(job_id)
+            if not lease or lease[0] != worker:
+                return {'ok': False}
+            self._leases[job_id] = (worker, time.time() + self.lease_seconds)
+            return {'ok': True}
+
+    def _complete(self, worker: str, request: Dict[str, Any]) -> Dict[str, Any]:
+        job_id = int(request.get('job_id', 0))
+        result = {
+            'success': bool(request.get('success')),
+            'reason': str(request.get('reason', '')),
+            'output_path': request.get('output_path'),
+            'wall_time': float(request.get('wall_time', 0.0)),
+            'cpu_time': float(request['cpu_time']) if request.get('cpu_time') is not None else None,
+            'bytes': int(request.get('bytes', 0)),
+        }
+        job = self._jobs.get(job_id)
+        if job is None:
+            return {'ok': False}
+        if result['output_path'] is not None and not _is_inside(str(result['output_path']), job['output_dir']):
+            result.update(success=False, reason=f"输出路径不在输出目录内: {result['output_path']}",
+                          output_path=None)
+        with self._cond:
+            info = self._touch_worker(worker)
+            lease = self._leases.get(job_id)
+            # 租约已过期但任务还在排队时，只接受最后领取该任务的 worker 迟到的结果
+            holds_lease = lease is not None and lease[0] == worker
+            late = lease is None and job['state'] == 'queued' and job.get('last_worker') == worker
+            if not (holds_lease or late):
+                return {'ok': False}
+            result['late'] = late
+            if holds_lease:
+                del self._leases[job_id]
+                info['active'] -= 1
+            self._queue.pop(job_id, None)
+            info['files'] += 1
+            info['bytes'] += result['bytes']
+            retry = False
+            if result['success']:
+                job['state'] = 'done'
+                info['succeeded'] += 1
+                info['consecutive_failures'] = 0
+            else:
+                info['failed'] += 1
+                info['consecutive_failures'] += 1
+                if info['consecutive_failures'] >= self.max_worker_failures:
+                    info['disabled'] = True
+                if worker not in job['failed_workers']:
+                    job['failed_workers'].append(worker)
+                retry = job['attempts'] < self.max_attempts and self._other_workers_available(job, worker)
+                job['state'] = 'queued' if retry else 'failed'
+                if retry:
+                    self._queue[job_id] = None
+            completed = dict(job)
+            self._callbacks_running += 1
+
+        try:
+            callback = self.on_retry if retry else self.on_complete
+            if callback:
+                callback(completed, result, worker)
+        finally:
+            self._callback_finished()
+        return {'ok': True}
+
+    def _callback_finished(self):
+        with self._cond:
+            self._callbacks_running -= 1
+            self._cond.notify_all()
+
+    def _reap_expired_leases(self):
+        """定期检查租约，过期任务重新排队（超过重试次数则失败）"""
+        while not self._stopped.wait(min(1.0, self.lease_seconds / 3)):
+            expired = []
+            now = time.time()
+            with self._cond:
+                for job_id, (worker, deadline) in list(self._leases.items()):
+                    if deadline > now:
+                        continue
+                    del self._leases[job_id]
+                    self._workers[worker]['active'] -= 1
+                    job = self._jobs[job_id]
+                    if job['attempts'] >= self.max_attempts:
+                        job['state'] = 'failed'
+                    else:
+                        job['state'] = 'queued'
+                        # 重新排到队首，尽快交给其他 worker
+                        self._queue[job_id] = None
+                        self._queue.move_to_end(job_id, last=False)
+                    expired.append((dict(job), worker))
+                    self._callbacks_running += 1
+
+            for job, worker in expired:
+                try:
+                    if self.on_expire:
+                        self.on_expire(job, worker)
+                finally:
+                    self._callback_finished()
+
+
+class _JobRequestHandler(BaseHTTPRequestHandler):
+    """HTTP 接口: POST /register|/lease|/heartbeat|/complete，GET /status，请求和响应均为 JSON"""
+
+    def do_GET(self):
+        if self._authorized():
+            self._dispatch(self.path.strip('/'), {})
+
+    def do_POST(self):
+        # 先校验令牌再读取请求体，未授权的请求不会让服务器缓冲任何数据
+        if not self._authorized():
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= MAX_REQUEST_BYTES:
+            self._reply(413, {'error': 'request too large'})
+            return
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._reply(400, {'error': 'invalid json'})
+            return
+        if not isinstance(request, dict):
+            self._reply(400, {'error': 'request must be a json object'})
+            return
+        self._dispatch(self.path.strip('/'), request)
+
+    def _authorized(self) -> bool:
+        job_server: JobServer = self.server.job_server
+        token = self.headers.get('X-Job-Token') or ''
+        if job_server.token and not hmac.compare_digest(token.encode(), job_server.token.encode()):
+            self._reply(403, {'error': 'invalid token'})
+            return False
+        return True
+
+    def _dispatch(self, action: str, request: Dict[str, Any]):
+        job_server: JobServer = self.server.job_server
+        if self.command == 'GET' and action != 'status':
+            self._reply(404, {'error': 'not found'})
+            return
+        try:
+            self._reply(200, job_server.handle(action, request))
+        except (ValueError, TypeError) as e:
+            self._reply(400, {'error': str(e)})
+
+    def _reply(self, status: int, body: Dict[str, Any]):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        if status >= 400:
+            # 请求体可能没有读取，不再复用连接
+            self.close_connection = True
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except ConnectionError:
+            # worker 在请求期间退出（被结束或断网），租约会按过期处理
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        # 不向 stderr 打印每个请求
+        pass
+
+
+class JobWorker:
+    """worker 代理：从任务服务器领取任务并调用 um 处理
+
+    path_map 用于不同机器上共享存储挂载路径不同的情况，例如 [("Z:\\\\music", "/mnt/music")]，
+    服务器下发的路径按前缀替换为本机路径，上报的输出路径再反向替换。
+    """
+
+    def __init__(self, server_url: str, um_path: str, name: Optional[str] = None,
+                 path_map: Optional[List[Tuple[str, str]]] = None, token: Optional[str] = None,
+                 poll_interval: float = 2.0, timeout: float = 300.0):
+        self.server_url = server_url.rstrip('/')
+        self.um_path = um_path
+        self.name = name or f"{socket.gethostname()}-{os.getpid()}"
+        self.path_map = path_map or []
+        self.token = token if token is not None else os.environ.get(TOKEN_ENV_VAR) or None
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.heartbeat_interval = 10.0
+
+    def run(self, exit_when_idle: bool = False) -> int:
+        """领取并处理任务，返回进程退出码
+
+        exit_when_idle 为 True 时服务器没有剩余任务或无法连接即退出；令牌错误时直接退出，重试也不会成功。
+        """
+        while True:
+            try:
+                config = self._call('register', {})
+                self.heartbeat_interval = float(config.get('heartbeat_interval', self.heartbeat_interval))
+                break
+            except urllib.error.HTTPError as e:
+                print(f"任务服务器拒绝请求: {self._describe_error(e)}", file=sys.stderr)
+                if e.code in (401, 403) or exit_when_idle:
+                    return 1
+                time.sleep(self.poll_interval)
+            except OSError as e:
+                if exit_when_idle:
+                    print(f"无法连接任务服务器: {e}", file=sys.stderr)
+                    return 1
+                time.sleep(self.poll_interval)
+
+        disabled = False
+        while True:
+            try:
+                response = self._call('lease', {})
+            except urllib.error.HTTPError as e:
+                print(f"领取任务失败: {self._describe_error(e)}", file=sys.stderr)
+                if e.code in (401, 403):
+                    return 1
+                time.sleep(self.poll_interval)
+                continue
+            except OSError as e:
+                if exit_when_idle:
+                    return 0
+                print(f"领取任务失败: {e}", file=sys.stderr)
+                time.sleep(self.poll_interval)
+                continue
+
+            job = response.get('job')
+            if job is None:
+                if response.get('disabled'):
+                    # 连续失败后服务器不再分配任务，下一批任务开始时恢复
+                    if not disabled:
+                        print("连续处理失败，服务器已暂停向本 worker 分配任务，请检查 um 和共享存储路径", file=sys.stderr)
+                    disabled = True
+                    if exit_when_idle:
+                        return 0
+                if exit_when_idle and response.get('idle'):
+                    return 0
+                time.sleep(self.poll_interval)
+                continue
+            disabled = False
+
+            result = self._run_job(job)
+            if result['success']:
+                print(f"处理成功: {job['path']}")
+            else:
+                print(f"处理失败: {job['path']} - {result['reason']}", file=sys.stderr)
+            try:
+                self._call('complete', dict(result, job_id=job['job_id']))
+            except OSError as e:
+                # 上报失败时由服务器的租约过期机制重新分配
+                print(f"上报结果失败: {e}", file=sys.stderr)
+
+    def _run_job(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """调用 um 处理单个任务，处理期间后台线程定期发送心跳"""
+        path = self._to_local(job['path'])
+        cmd = [self.um_path, "-i", path, "-o", self._to_local(job['output_dir'])]
+        cmd.extend(arg for arg in job.get('args', []) if arg in ALLOWED_UM_ARGS)
+
+        try:
+            nbytes = os.path.getsize(path)
+        except OSError:
+            nbytes = 0
+
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(job['job_id'], stop_heartbeat), daemon=True)
+        heartbeat.start()
+        start = time.perf_counter()
+        cpu_time = None
+        try:
+            proc, cpu_time = run_um(cmd, self.timeout)
+            success = proc.returncode == 0
+            reason = "" if success else (proc.stderr.strip() or f"exit code {proc.returncode}")
+            output_path = parse_um_destination(proc.stdout or "") if success else None
+        except subprocess.TimeoutExpired:
+            success, reason, output_path = False, "timeout", None
+        except OSError as e:
+            success, reason, output_path = False, str(e), None
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+
+        return {
+            'success': success,
+            'reason': reason,
+            'output_path': self._to_remote(output_path) if output_path else None,
+            'wall_time': time.perf_counter() - start,
+            'cpu_time': cpu_time,
+            'bytes': nbytes,
+        }
+
+    @staticmethod
+    def _describe_error(error: urllib.error.HTTPError) -> str:
+        """HTTP 错误码加上服务器返回的错误信息"""
+        try:
+            detail = json.loads(error.read().decode("utf-8")).get('error', '')
+        except (OSError, ValueError, AttributeError):
+            detail = ''
+        message = f"HTTP {error.code} {detail or error.reason}"
+        if error.code in (401, 403):
+            message += "（请检查 --token 或环境变量 " + TOKEN_ENV_VAR + "）"
+        return message
+
+    def _heartbeat(self, job_id: int, stop: threading.Event):
+        while not stop.wait(self.heartbeat_interval):
+            try:
+                self._call('heartbeat', {'job_id': job_id})
+            except OSError:
+                continue
+
+    def _call(self, action: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        data = json.dumps(dict(payload, worker=self.name)).encode("utf-8")
+        request = urllib.request.Request(f"{self.server_url}/{action}", data=data, method="POST",
+                                         headers={'Content-Type': 'application/json'})
+        if self.token:
+            request.add_header('X-Job-Token', self.token)
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.loads(response.read().decode("utf-8"))
+
+    def _to_local(self, path: str) -> str:
+        return self._map_path(path, self.path_map)
+
+    def _to_remote(self, path: str) -> str:
+        return self._map_path(path, [(local, remote) for remote, local in self.path_map])
+
+    @staticmethod
+    def _map_path(path: str, mapping: List[Tuple[str, str]]) -> str:
+        for prefix, replacement in mapping:
+            if not path.startswith(prefix):
+                continue
+            rest = path[len(prefix):]
+            # 路径分隔符跟随替换后的前缀（Windows 与 Linux 挂载互相映射时）
+            if '\\' in replacement:
+                rest = rest.replace('/', '\\')
+            elif '/' in replacement:
+                rest = rest.replace('\\', '/')
+            return replacement + rest
+        return path
+
+
+def main():
+    """命令行入口"""
+    if sys.stderr is None:
+        # 打包的窗口程序（PyInstaller console=False）没有控制台，输出写入当前目录下的日志文件
+        log = open(WORKER_LOG_FILE, "a", encoding="utf-8", buffering=1)
+        sys.stdout = sys.stderr = log
+    parser = argparse.ArgumentParser(description="Unlock Music 分布式任务 worker")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    worker_parser = subparsers.add_parser("worker", help="从任务服务器领取任务并调用 um 处理")
+    worker_parser.add_argument("--server", required=True, help="任务服务器地址，如 http://192.168.1.10:8765")
+    worker_parser.add_argument("--um", help="um 可执行文件路径，默认与 GUI 相同的查找方式（程序所在目录、当前目录）")
+    worker_parser.add_argument("--name", help="worker 名称，默认 主机名-进程号")
+    worker_parser.add_argument("--path-map", action="append", default=[], metavar="REMOTE=LOCAL",
+                               help="共享存储路径映射，可重复指定")
+    worker_parser.add_argument("--token", help=f"访问令牌，默认读取环境变量 {TOKEN_ENV_VAR}")
+    worker_parser.add_argument("--exit-when-idle", action="store_true", help="服务器没有剩余任务时退出")
+
+    args = parser.parse_args()
+    path_map = []
+    for item in args.path_map:
+        remote, sep, local = item.partition("=")
+        if not sep:
+            parser.error(f"无效的路径映射: {item}")
+        path_map.append((remote, local))
+
+    um_path = args.um or find_um_executable()
+    if not um_path:
+        parser.error("未找到 um 可执行文件，请用 --um 指定")
+
+    worker = JobWorker(args.server, um_path, name=args.name, path_map=path_map, token=args.token)
+    sys.exit(worker.run(exit_when_idle=args.exit_when_idle))
+
+
+if __name__ == "__main__":
+    main()
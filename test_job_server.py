@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+job_server 测试：在本机启动任务服务器和多个 worker 进程，用假的 um 脚本代替真实解密。
+
+运行: python -m unittest test_job_server
+"""
+
+import os
+import sys
+import time
+import shutil
+import signal
+import tempfile
+import textwrap
+import threading
+import subprocess
+import unittest
+from typing import Any, Callable, Dict, List, Tuple
+
+from job_server import JobServer
+
+JOB_SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_server.py")
+TOKEN = "test-token"
+
+# 假的 um：按 -i/-o 参数在输出目录生成 .flac，并像 um 一样在日志行末尾输出带 destination 的 JSON
+FAKE_UM = textwrap.dedent('''\
+    import json, os, sys, time
+    args = sys.argv[1:]
+    src = args[args.index("-i") + 1]
+    out_dir = args[args.index("-o") + 1]
+    mode = {mode!r}
+    if mode == "slow":
+        time.sleep(60)
+    if mode == "fail":
+        print("decode failed", file=sys.stderr)
+        sys.exit(1)
+    dest = os.path.join(out_dir, os.path.splitext(os.path.basename(src))[0] + ".flac")
+    if mode == "outside":
+        dest = os.path.abspath(os.path.join(out_dir, "..", "outside.flac"))
+    with open(dest, "w") as f:
+        f.write("decoded")
+    print("INFO successfully converted " + json.dumps({{"source": src, "destination": dest}}))
+''')
+
+
+@unittest.skipIf(os.name == 'nt', "假的 um 脚本依赖 POSIX 的 shebang")
+class JobServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp(prefix="job-server-test-")
+        self.src_dir = os.path.join(self.tmp, "src")
+        self.out_dir = os.path.join(self.tmp, "out")
+        os.makedirs(self.src_dir)
+        os.makedirs(self.out_dir)
+        self.events: List[Tuple[str, Dict[str, Any], Dict[str, Any], str]] = []
+        self.events_lock = threading.Lock()
+        self.server = None
+        self.workers: List[subprocess.Popen] = []
+
+    def tearDown(self):
+        for proc in self.workers:
+            if proc.poll() is None:
+                os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+            for stream in (proc.stdout, proc.stderr):
+                if stream:
+                    stream.close()
+        if self.server:
+            self.server.stop()
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    # ---- 辅助方法 ----
+
+    def make_um(self, mode: str) -> str:
+        path = os.path.join(self.tmp, f"um_{mode}")
+        with open(path, "w") as f:
+            f.write(f"#!{sys.executable}\n" + FAKE_UM.format(mode=mode))
+        os.chmod(path, 0o755)
+        return path
+
+    def make_files(self, count: int) -> List[str]:
+        paths = []
+        for i in range(count):
+            path = os.path.join(self.src_dir, f"song{i}.ncm")
+            with open(path, "wb") as f:
+                f.write(b"x" * 1000)
+            paths.append(path)
+        return paths
+
+    def record(self, kind: str) -> Callable:
+        def callback(job, *rest):
+            result = rest[0] if len(rest) == 2 else {}
+            with self.events_lock:
+                self.events.append((kind, job, result, rest[-1]))
+        return callback
+
+    def find_events(self, kind: str) -> List[Tuple[str, Dict[str, Any], Dict[str, Any], str]]:
+        with self.events_lock:
+            return [event for event in self.events if event[0] == kind]
+
+    def start_server(self, paths: List[str], lease_seconds: float = 30.0, **kwargs) -> JobServer:
+        self.server = JobServer(host="127.0.0.1", port=0, lease_seconds=lease_seconds, token=TOKEN,
+                                on_lease=self.record('lease'), on_complete=self.record('complete'),
+                                on_retry=self.record('retry'), on_expire=self.record('expire'), **kwargs)
+        for path in paths:
+            self.server.submit(path, self.out_dir, [])
+        self.server.start()
+        return self.server
+
+    def start_worker(self, name: str, um_path: str, token: str = TOKEN) -> subprocess.Popen:
+        proc = subprocess.Popen(
+            [sys.executable, JOB_SERVER_SCRIPT, "worker", "--server", f"http://127.0.0.1:{self.server.port}",
+             "--um", um_path, "--name", name, "--token", token, "--exit-when-idle"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+            start_new_session=True)  # 便于连同 um 子进程一起结束
+        self.workers.append(proc)
+        return proc
+
+    def wait_until(self, predicate: Callable[[], bool], timeout: float = 20.0):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            if time.monotonic() > deadline:
+                self.fail(f"等待超时，已有事件: {[(e[0], e[3]) for e in self.events]}")
+            time.sleep(0.05)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {stat['worker']: stat for stat in self.server.worker_stats()}
+
+    # ---- 测试 ----
+
+    def test_all_jobs_complete_with_several_workers(self):
+        paths = self.make_files(6)
+        self.start_server(paths)
+        um = self.make_um("ok")
+        workers = [self.start_worker(f"w{i}", um) for i in range(3)]
+
+        self.assertTrue(self.server.wait(timeout=30))
+        completed = self.find_events('complete')
+        self.assertEqual(sorted(event[1]['path'] for event in completed), paths)
+        self.assertTrue(all(event[2]['success'] and not event[2]['late'] for event in completed))
+        for path in paths:
+            name = os.path.splitext(os.path.basename(path))[0] + ".flac"
+            self.assertTrue(os.path.isfile(os.path.join(self.out_dir, name)))
+
+        stats = self.stats()
+        self.assertEqual(sum(stat['succeeded'] for stat in stats.values()), 6)
+        self.assertEqual(sum(stat['failed'] for stat in stats.values()), 0)
+        for proc in workers:
+            self.assertEqual(proc.wait(timeout=20), 0)
+
+    def test_job_of_killed_worker_is_leased_again(self):
+        paths = self.make_files(1)
+        self.start_server(paths, lease_seconds=1.0)
+        stuck = self.start_worker("stuck", self.make_um("slow"))
+        self.wait_until(lambda: self.find_events('lease'))
+        os.killpg(stuck.pid, signal.SIGKILL)
+
+        self.wait_until(lambda: self.find_events('expire'))
+        expired = self.find_events('expire')[0]
+        self.assertEqual((expired[1]['state'], expired[3]), ('queued', 'stuck'))
+
+        self.start_worker("healthy", self.make_um("ok"))
+        self.assertTrue(self.server.wait(timeout=30))
+        completed = self.find_events('complete')
+        self.assertEqual(len(completed), 1)
+        self.assertEqual(completed[0][3], "healthy")
+        self.assertTrue(completed[0][2]['success'])
+        self.assertEqual(completed[0][1]['attempts'], 2)
+
+    def test_failed_job_is_retried_on_another_worker(self):
+        paths = self.make_files(1)
+        self.start_server(paths, lease_seconds=5.0)
+        # 先让 healthy 上线，failing 报告失败时才有其他 worker 可以重试
+        self.server.handle('register', {'worker': 'healthy'})
+        failing = self.start_worker("failing", self.make_um("fail"))
+        self.wait_until(lambda: self.find_events('retry'))
+
+        self.start_worker("healthy", self.make_um("ok"))
+        self.assertTrue(self.server.wait(timeout=30))
+        self.assertEqual(failing.wait(timeout=20), 0)
+        retried = self.find_events('retry')
+        self.assertEqual([(event[3], event[2]['success']) for event in retried], [("failing", False)])
+        completed = self.find_events('complete')
+        self.assertEqual([(event[3], event[2]['success']) for event in completed], [("healthy", True)])
+
+        stats = self.stats()
+        self.assertEqual((stats['failing']['succeeded'], stats['failing']['failed']), (0, 1))
+        self.assertEqual((stats['healthy']['succeeded'], stats['healthy']['failed']), (1, 0))
+
+    def test_worker_is_disabled_after_consecutive_failures(self):
+        paths = self.make_files(3)
+        self.start_server(paths, max_worker_failures=2)
+        failing = self.start_worker("failing", self.make_um("fail"))
+        self.assertEqual(failing.wait(timeout=20), 0)
+
+        self.assertTrue(self.stats()['failing']['disabled'])
+        self.assertEqual(len(self.find_events('complete')), 2)
+        self.assertFalse(self.server.wait(timeout=0.2))  # 第三个任务仍在排队等待其他 worker
+
+    def test_late_result_is_accepted_only_from_last_worker(self):
+        paths = self.make_files(1)
+        self.start_server(paths, lease_seconds=0.5)
+        job = self.server.handle('lease', {'worker': 'slow'})['job']
+        self.wait_until(lambda: self.find_events('expire'))
+
+        output_path = os.path.join(self.out_dir, "song0.flac")
+        report = {'job_id': job['job_id'], 'success': True, 'output_path': output_path, 'bytes': 1000}
+        self.assertFalse(self.server.handle('complete', dict(report, worker='other'))['ok'])
+        self.assertTrue(self.server.handle('complete', dict(report, worker='slow'))['ok'])
+
+        completed = self.find_events('complete')
+        self.assertEqual(len(completed), 1)
+        self.assertTrue(completed[0][2]['success'])
+        self.assertTrue(completed[0][2]['late'])
+        self.assertTrue(self.server.wait(timeout=5))
+
+    def test_output_path_outside_output_dir_is_rejected(self):
+        paths = self.make_files(1)
+        self.start_server(paths)
+        self.start_worker("evil", self.make_um("outside"))
+        self.assertTrue(self.server.wait(timeout=30))
+
+        completed = self.find_events('complete')
+        self.assertEqual(len(completed), 1)
+        self.assertFalse(completed[0][2]['success'])
+        self.assertIsNone(completed[0][2]['output_path'])
+        self.assertIn("输出路径不在输出目录内", completed[0][2]['reason'])
+
+    def test_worker_with_wrong_token_exits(self):
+        self.start_server(self.make_files(1))
+        proc = self.start_worker("intruder", self.make_um("ok"), token="wrong")
+        self.assertEqual(proc.wait(timeout=20), 1)
+        self.assertIn("403", proc.stderr.read())
+        self.assertEqual(self.find_events('lease'), [])
+
+
+if __name__ == "__main__":
+    unittest.main()